@@ -1,9 +1,60 @@
 import argparse
 import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator
 
+from src.copy_and_riff_transformer import CopyAndRiffTransformer
+from src.pipeline import run_pipeline
 from src.rename_transformer import RenameTransformer
 from src.riff_metadata_transformer import RiffMetadataTransformer
 
+
+def scan_dir(path: str) -> tuple[list[str], list[str]]:
+    """
+    Lists the non-hidden entries directly in `path`, using the file type cached by `os.scandir`.
+    Symlinked files are included, symlinked directories are not followed.
+    Directories that cannot be read are skipped, like `os.walk` does.
+
+    :return: (directories, files)
+    """
+    directories = []
+    files = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.name.startswith("."):
+                    continue  # hidden file or directory
+                if entry.is_dir(follow_symlinks=False):
+                    directories.append(entry.path)
+                elif entry.is_file():
+                    files.append(entry.path)
+    except OSError:
+        return [], []  # e.g. "System Volume Information" on an external drive
+    return directories, files
+
+
+def scan_files(path: str) -> Iterator[str]:
+    """
+    Recursively yields non-hidden files under `path`.
+    """
+    directories, files = scan_dir(path)
+    yield from files
+    for directory in directories:
+        yield from scan_files(directory)
+
+
+def collect_files(path: str, jobs: int) -> list[str]:
+    """
+    Collects all files under `path`, scanning each top-level directory in parallel.
+    """
+    directories, filenames = scan_dir(path)
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        for subtree in executor.map(lambda directory: list(scan_files(directory)), directories):
+            filenames.extend(subtree)
+    return filenames
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("source", metavar="SOURCE_DIR", type=str)
@@ -11,35 +62,38 @@ if __name__ == "__main__":
                         help='Copy files to a new folder structure inside the target directory')
     parser.add_argument('--add-metadata', action='store_true',
                         help='Add BPM and Root Note metadata to WAV files (in-place)')
+    parser.add_argument('--jobs', metavar='N', type=int, default=os.cpu_count() or 1,
+                        help='Number of files to process in parallel (default: number of CPUs)')
     args = parser.parse_args()
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+
+    # Each file's log is written with a single write; let those fill up whole blocks instead of flushing every line
+    sys.stdout.reconfigure(line_buffering=False)
 
     working_dir = os.getcwd()
     source_path = args.source
     os.chdir(source_path)
 
-    transformers = []
-    if args.restructure:
-        transformers.append(RenameTransformer(args.restructure))
-    if args.add_metadata:
-        transformers.append(RiffMetadataTransformer())
+    transformer = None
+    if args.restructure and args.add_metadata:
+        transformer = CopyAndRiffTransformer(args.restructure)
+    elif args.restructure:
+        transformer = RenameTransformer(args.restructure)
+    elif args.add_metadata:
+        transformer = RiffMetadataTransformer()
 
     # Collect filenames
-    source_filenames = []
-    for root, dirs, files in os.walk("."):
-        for filename in files:
-            if filename.startswith("."):
-                continue  # hidden file
-            source_filenames.append(os.path.join(root, filename))
+    source_filenames = collect_files(".", args.jobs)
 
     # Prepare
-    filenames = source_filenames
-    for transformer in transformers:
-        filenames = transformer.prepare_transform(filenames)
-
-    # Transform
-    for filename in source_filenames:
-        print("--- ", os.path.abspath(filename))
-        for transformer in transformers:
-            filename = transformer.transform(filename)
+    if transformer:
+        transformer.prepare_transform(source_filenames)
+
+    # Transform, all files in parallel, printing the output of each file in order
+    source_dir = os.getcwd()  # same as os.path.abspath, without a getcwd call per file
+    logs = [f"---  {os.path.normpath(os.path.join(source_dir, filename))}\n" for filename in source_filenames]
+    for log in run_pipeline(transformer, source_filenames, logs, args.jobs):
+        sys.stdout.write(log)
 
     print("DONE")
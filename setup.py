@@ -0,0 +1,5 @@
+from setuptools import setup
+from Cython.Build import cythonize
+
+# Only builds the optional compiled file name scanner in place: python setup.py build_ext --inplace
+setup(ext_modules=cythonize("src/_fast.pyx"))
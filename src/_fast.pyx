@@ -0,0 +1,86 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+"""
+Compiled version of the file name scanner of RiffMetadataTransformer, built with `python setup.py build_ext --inplace`.
+Must behave exactly like RiffMetadataTransformer._scan_metadata, which is used when this module is not built.
+"""
+
+
+cdef inline bint _is_separator(Py_UCS4 c):
+    return c == u"-" or c.isspace()
+
+
+cdef inline bint _is_root_note_letter(Py_UCS4 c):
+    return u"A" <= c <= u"G" or u"a" <= c <= u"g"
+
+
+cdef inline bint _is_accidental(Py_UCS4 c):
+    return c == u"#" or c == u"b" or c == u"B"
+
+
+cdef inline bint _is_word_char(Py_UCS4 c):
+    return u"A" <= c <= u"Z" or u"a" <= c <= u"z" or u"0" <= c <= u"9" or c == u"#"
+
+
+cdef bint _is_bpm_suffix(str s, Py_ssize_t i, Py_ssize_t n):
+    if i < n and s[i].isspace():
+        i += 1
+    return s[i:i + 3].lower() == "bpm"
+
+
+cdef object _scan_bpm(str s, Py_ssize_t start, Py_ssize_t n):
+    cdef Py_ssize_t i = start, j
+    while i < n and s[i].isdecimal():
+        i += 1
+    if i == start:
+        return None
+    if i < n and s[i] == u".":
+        j = i + 1
+        while j < n and s[j].isdecimal():
+            j += 1
+        if j > i + 1 and _is_bpm_suffix(s, j, n):
+            return float(s[start:j])
+    if _is_bpm_suffix(s, i, n):
+        return float(s[start:i])
+    return None
+
+
+cdef object _scan_root_note(str s, Py_ssize_t start, Py_ssize_t n):
+    cdef Py_ssize_t i, end
+    if start < n and s[start] == u"(":
+        i = start + 1
+        if i < n and _is_root_note_letter(s[i]):
+            end = i + 2 if i + 1 < n and _is_accidental(s[i + 1]) else i + 1
+            if end < n and s[end] == u")":
+                return s[i:end]
+        return None
+    if start < n and _is_root_note_letter(s[start]):
+        end = start + 2 if start + 1 < n and _is_accidental(s[start + 1]) else start + 1
+        if end == n or not _is_word_char(s[end]):
+            return s[start:end]
+    return None
+
+
+def scan_metadata(str basename_root):
+    """
+    :return: (BPM, root note), either of them None if not present
+    """
+    cdef Py_ssize_t i, n = len(basename_root)
+    bpm = None
+    root_note = None
+    for i in range(n):
+        if not _is_separator(basename_root[i]):
+            continue
+        if bpm is None:
+            bpm = _scan_bpm(basename_root, i + 1, n)
+        if root_note is None:
+            root_note = _scan_root_note(basename_root, i + 1, n)
+        if bpm is not None and root_note is not None:
+            break
+    return bpm, root_note
+
+
+def scan_metadata_batch(list basename_roots):
+    """
+    :return: [(BPM, root note)] for each of the names
+    """
+    return [scan_metadata(basename_root) for basename_root in basename_roots]
@@ -0,0 +1,40 @@
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, TextIO
+
+from .rename_transformer import RenameTransformer
+from .riff_metadata_transformer import RiffChunkEditor, RiffMetadataTransformer
+from .transformer import Transformer
+
+
+class CopyAndRiffTransformer(Transformer):
+    """
+    Same as RenameTransformer followed by RiffMetadataTransformer, but in a single task per file: the headers of
+    WAV files with metadata are read once, then the file is copied to the new location and only the edited chunks
+    are patched in the copy (see RiffChunkEditor). If the edits change the size of a chunk, the tagged file is
+    written to the new location in one pass instead.
+    """
+    executor_class = ProcessPoolExecutor
+
+    def __init__(self, target_path: str):
+        self.rename_transformer = RenameTransformer(target_path)
+        self.riff_metadata_transformer = RiffMetadataTransformer()
+
+    def prepare_transform(self, filenames: List[str]) -> List[str]:
+        filenames = self.rename_transformer.prepare_transform(filenames)
+        self.riff_metadata_transformer.prepare_transform(filenames)
+        return filenames  # all files are copied, not only the WAV files
+
+    def transform(self, filename: str, out: TextIO) -> str:
+        bpm, root_note = self.riff_metadata_transformer.get_metadata(filename)
+        if not bpm and not root_note:
+            return self.rename_transformer.transform(filename, out)
+
+        new_path_full = self.rename_transformer.get_target_path(filename)
+        self.rename_transformer.make_target_dir(os.path.dirname(new_path_full))
+        print("  > ", new_path_full, file=out)
+        with RiffChunkEditor(filename, new_path_full) as editor:
+            self.riff_metadata_transformer.tag(editor, bpm, root_note, out)
+        shutil.copymode(filename, new_path_full)
+        return new_path_full
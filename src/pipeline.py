@@ -0,0 +1,70 @@
+import io
+from collections import deque
+from concurrent.futures import Future
+from typing import Iterator, Optional
+
+from .transformer import Transformer
+
+# Transformer being run, set once in every worker instead of being sent along with each file
+_transformer: Optional[Transformer] = None
+
+
+def _init_worker(transformer: Transformer):
+    global _transformer
+    _transformer = transformer
+
+
+def _run_transform(filename: str) -> str:
+    """
+    Runs the transformer on a single file, buffering its output so that it can be printed in order.
+    """
+    out = io.StringIO()
+    _transformer.transform(filename, out)
+    return out.getvalue()
+
+
+def _complete(log: str, future: Optional[Future]) -> Iterator[str]:
+    """
+    Yields the complete log of a file once its transform is done. If the transform failed, the initial log naming
+    the file is still yielded before the exception is re-raised.
+    """
+    if future is None:
+        yield log
+        return
+    try:
+        result = future.result()
+    except BaseException:
+        yield log
+        raise
+    yield log + result
+
+
+def run_pipeline(transformer: Optional[Transformer], filenames: list[str], logs: list[str], jobs: int) \
+        -> Iterator[str]:
+    """
+    Runs the transformer on all files in parallel and yields the complete log of each file, in the original order.
+
+    At most `4 * jobs` files are in flight at once, so the output streams as files complete while memory stays
+    bounded. Copying and tagging a file are done in a single task by CopyAndRiffTransformer, so the copies and
+    tags of different files already overlap within the executor.
+
+    :param logs: the initial log of each file
+    """
+    if transformer is None:
+        yield from logs
+        return
+
+    executor = transformer.executor_class(max_workers=jobs, initializer=_init_worker, initargs=(transformer,))
+    try:
+        in_flight: deque[tuple[str, Optional[Future]]] = deque()
+        for filename, log in zip(filenames, logs):
+            future = None
+            if transformer.accepts(filename):
+                future = executor.submit(_run_transform, filename)
+            in_flight.append((log, future))
+            if len(in_flight) >= 4 * jobs:
+                yield from _complete(*in_flight.popleft())
+        while in_flight:
+            yield from _complete(*in_flight.popleft())
+    finally:
+        executor.shutdown(cancel_futures=True)
@@ -1,11 +1,13 @@
+import errno
 import os
 import sys
 import shutil
-from typing import List
+from types import MappingProxyType
+from typing import List, TextIO
 
 from .transformer import Transformer
 
-INSTRUMENTS_MAP = {
+INSTRUMENTS_MAP = MappingProxyType({
     "808": "808s",
     "808s & Basses": "808s & Bass",
     "Basses": "Bass",
@@ -16,7 +18,35 @@ INSTRUMENTS_MAP = {
     "Melodies": "Melody Loops",
     "MIDI": "Melody Loops/MIDI",
     "Top Loops": "Percussion Loops",
-}
+})
+
+
+def copy_file(source: str, target: str):
+    """
+    Same as shutil.copy2, but lets the kernel copy the data with copy_file_range, which only creates a reflink
+    on filesystems that support it (e.g. btrfs, XFS).
+    """
+    if not hasattr(os, "copy_file_range"):
+        shutil.copy2(source, target)
+        return
+    try:
+        with open(source, "rb") as fsrc, open(target, "wb") as fdst:
+            size = os.fstat(fsrc.fileno()).st_size
+            copied = 0
+            while n := os.copy_file_range(fsrc.fileno(), fdst.fileno(), 1 << 30):
+                copied += n
+    except OSError as e:
+        if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EOPNOTSUPP, errno.EINVAL):
+            raise
+        # e.g. source and target on different filesystems on an older kernel
+        shutil.copy2(source, target)
+        return
+    if copied < size or copied == 0:
+        # copy_file_range returns 0 early on pseudo filesystems: sysfs files report a larger size than is copied,
+        # procfs files report a size of 0. Copying nothing is also cheap to redo for genuinely empty files.
+        shutil.copy2(source, target)
+        return
+    shutil.copystat(source, target)
 
 
 class RenameTransformer(Transformer):
@@ -28,24 +58,25 @@ class RenameTransformer(Transformer):
     """
     def __init__(self, target_path: str):
         self.target_path = target_path
+        # resolved once, so that target paths are absolute without an os.getcwd() call per file
+        self._target_path_abs = os.path.abspath(target_path)
 
         self._types = set()
         self._instruments = set()
         self._renames = {}
+        self._created_dirs: set[str] = set()
 
     def prepare_transform(self, filenames: List[str]) -> List[str]:
-        renames = {
-            path: self._get_new_path(path)
-            for path in filenames
-        }
-
-        # check duplicates
+        renames = {}
         target_paths = set()
         duplicates = []
-        for s, t in renames.items():
-            if t in target_paths:
-                duplicates.append(t)
-            target_paths.add(t)
+        for path in filenames:
+            new_path = self._get_new_path(path)
+            # check duplicates
+            if new_path in target_paths:
+                duplicates.append(new_path)
+            target_paths.add(new_path)
+            renames[path] = new_path
         if duplicates:
             print("DUPLICATES:", file=sys.stderr)
             for t in sorted(duplicates):
@@ -56,6 +87,11 @@ class RenameTransformer(Transformer):
         print("Instruments: ", sorted(map(str, self._instruments)))
 
         self._renames = renames
+
+        # create all target directories up-front, so that the (parallel) transforms don't have to
+        for filename in renames:
+            self.make_target_dir(os.path.dirname(self.get_target_path(filename)))
+
         return list(renames.values())
 
     def _get_new_path(self, path):
@@ -65,20 +101,31 @@ class RenameTransformer(Transformer):
         return new_path
 
     def _parse_path(self, path):
-        parts = os.path.normpath(os.path.dirname(path)).split(os.sep)
-        type = parts[0]
+        # split the whole path once, instead of separate dirname/basename + normpath calls
+        *parts, basename = os.path.normpath(path).split(os.sep)
+        type = parts[0] if parts else os.curdir
         instrument = parts[2] if len(parts) > 2 else None
-        if instrument in INSTRUMENTS_MAP:
-            instrument = INSTRUMENTS_MAP[instrument]
+        instrument = INSTRUMENTS_MAP.get(instrument, instrument)
         self._types.add(type)
         self._instruments.add(instrument.split("/")[0] if instrument else None)
-        rest = parts[3:] + [os.path.basename(path)]
+        rest = parts[3:] + [basename]
         return type, instrument, rest
 
-    def transform(self, filename: str) -> str:
+    def get_target_path(self, filename: str) -> str:
         new_path = self._renames[filename]
-        new_path_full = os.path.normpath(os.path.join(self.target_path, new_path))
-        os.makedirs(os.path.dirname(new_path_full), exist_ok=True)
-        shutil.copy2(filename, new_path_full)
-        print("  > ", os.path.abspath(new_path_full))
+        return os.path.normpath(os.path.join(self._target_path_abs, new_path))
+
+    def make_target_dir(self, target_dir: str):
+        """
+        Same as os.makedirs, but each directory is only created once.
+        """
+        if target_dir not in self._created_dirs:
+            os.makedirs(target_dir, exist_ok=True)
+            self._created_dirs.add(target_dir)
+
+    def transform(self, filename: str, out: TextIO) -> str:
+        new_path_full = self.get_target_path(filename)
+        self.make_target_dir(os.path.dirname(new_path_full))
+        copy_file(filename, new_path_full)
+        print("  > ", new_path_full, file=out)
         return new_path_full
@@ -1,38 +1,58 @@
+import mmap
 import os
-import re
-from struct import pack, unpack
-from typing import BinaryIO, List, Optional
-
-from wave_chunk_parser.exceptions import InvalidHeaderException
-from wave_chunk_parser.utils import word_align, seek_and_read
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from struct import Struct, pack, unpack_from
+from types import MappingProxyType
+from typing import BinaryIO, List, Optional, TextIO
+
+from wave_chunk_parser.exceptions import InvalidHeaderException, InvalidWaveException
+from wave_chunk_parser.utils import seek_and_read
 from wave_chunk_parser.chunks import RiffChunk, Chunk, FormatChunk, DataChunk, GenericChunk
 
+from .rename_transformer import copy_file
 from .transformer import Transformer
 
-NOTE_OFFSET_MAP = {n.lower(): o for n, o in {
-    "C": 0,
-    "C#": 1,
-    "Db": 1,
-    "D": 2,
-    "D#": 3,
-    "Eb": 3,
-    "E": 4,
-    "F": 5,
-    "F#": 6,
-    "Gb": 6,
-    "G": 7,
-    "G#": 8,
-    "Ab": 8,
-    "A": 9,
-    "A#": 10,
-    "Bb": 10,
-    "B": 11,
-    "Cb": 11,
-}.items()}
+try:
+    from ._fast import scan_metadata_batch
+except ImportError:
+    scan_metadata_batch = None  # compiled scanner is not built, see setup.py
+
+# contains every upper/lower case spelling of each note, so that lookups need no case folding
+NOTE_OFFSET_MAP = MappingProxyType({
+    spelling: o
+    for n, o in {
+        "C": 0,
+        "C#": 1,
+        "Db": 1,
+        "D": 2,
+        "D#": 3,
+        "Eb": 3,
+        "E": 4,
+        "F": 5,
+        "F#": 6,
+        "Gb": 6,
+        "G": 7,
+        "G#": 8,
+        "Ab": 8,
+        "A": 9,
+        "A#": 10,
+        "Bb": 10,
+        "B": 11,
+        "Cb": 11,
+    }.items()
+    for spelling in map("".join, product(*({c.lower(), c.upper()} for c in n)))
+})
+
+
+ROOT_NOTE_LETTERS = frozenset("ABCDEFGabcdefg")
+ROOT_NOTE_ACCIDENTALS = frozenset("#bB")
+# characters that may not directly follow a root note, e.g. "C" in "Cymatics"
+ROOT_NOTE_WORD_CHARS = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789#")
 
 
 def get_note_offset(note: str) -> int:
-    return NOTE_OFFSET_MAP[note.lower()]
+    return NOTE_OFFSET_MAP[note]
 
 
 class AcidChunk(Chunk):
@@ -75,6 +95,8 @@ class AcidChunk(Chunk):
 
     HEADER_FORMAT = b"acid"
     LENGTH_CHUNK = 32
+    STRUCT_CHUNK = Struct("<4sIIHHfIHHf")  # 32 bytes, already word-aligned
+    STRUCT_CONTENT = Struct("<IHHfIHHf")
 
     def __init__(self, file_type: int, root_note: int, n_beats: int, tempo: float):
         self.file_type = file_type
@@ -84,10 +106,13 @@ class AcidChunk(Chunk):
 
     @property
     def get_name(self) -> str:
-        return str(self.HEADER_FORMAT)
+        return self.HEADER_FORMAT
 
     @classmethod
-    def from_bytes(cls, data: bytes) -> 'AcidChunk':
+    def from_bytes(cls, data: bytes, offset: int = 0) -> 'AcidChunk':
+        """
+        :param data: any object supporting the buffer protocol, e.g. bytes, a numpy array or an mmap
+        """
         (
             file_type,
             root_note,
@@ -97,10 +122,7 @@ class AcidChunk(Chunk):
             _,
             _,
             tempo,
-        ) = unpack(
-            "<IHHfIHHf",
-            data,
-        )
+        ) = cls.STRUCT_CONTENT.unpack_from(data, offset)
 
         return cls(file_type, root_note, n_beats, tempo)
 
@@ -108,7 +130,7 @@ class AcidChunk(Chunk):
     def from_generic_chunk(cls, chunk: Chunk) -> 'AcidChunk':
         # noinspection PyTypeChecker
         generic_chunk: GenericChunk = chunk
-        return cls.from_bytes(generic_chunk.datas.tobytes())
+        return cls.from_bytes(generic_chunk.datas)
 
     @classmethod
     def from_file(cls, file_handle: BinaryIO, offset: int) -> 'AcidChunk':
@@ -125,10 +147,8 @@ class AcidChunk(Chunk):
             )
         )
 
-    @word_align
     def to_bytes(self) -> bytes:
-        format = pack(
-            "<4sIIHHfIHHf",
+        format = self.STRUCT_CHUNK.pack(
             self.HEADER_FORMAT,
             24,  # length
             self.file_type,
@@ -162,6 +182,8 @@ class InstrumentChunk(Chunk):
 
     HEADER_FORMAT = b"inst"
     LENGTH_CHUNK = 7
+    STRUCT_CHUNK = Struct("<4sIBBBBBBBx")  # padded to 16 bytes to keep the chunk word-aligned
+    STRUCT_CONTENT = Struct("<BBBBBBB")
     UNSHIFTED_NOTE_C5 = 0x3c
 
     def __init__(
@@ -184,10 +206,13 @@ class InstrumentChunk(Chunk):
 
     @property
     def get_name(self) -> str:
-        return str(self.HEADER_FORMAT)
+        return self.HEADER_FORMAT
 
     @classmethod
-    def from_bytes(cls, data: bytes) -> 'InstrumentChunk':
+    def from_bytes(cls, data: bytes, offset: int = 0) -> 'InstrumentChunk':
+        """
+        :param data: any object supporting the buffer protocol, e.g. bytes, a numpy array or an mmap
+        """
         (
             unshifted_note,
             fine_tune,
@@ -196,10 +221,7 @@ class InstrumentChunk(Chunk):
             high_note,
             low_velocity,
             high_velocity,
-        ) = unpack(
-            "<BBBBBBB",
-            data,
-        )
+        ) = cls.STRUCT_CONTENT.unpack_from(data, offset)
 
         return cls(unshifted_note, fine_tune, gain, low_note, high_note, low_velocity, high_velocity)
 
@@ -207,7 +229,7 @@ class InstrumentChunk(Chunk):
     def from_generic_chunk(cls, chunk: Chunk) -> 'InstrumentChunk':
         # noinspection PyTypeChecker
         generic_chunk: GenericChunk = chunk
-        return cls.from_bytes(generic_chunk.datas.tobytes())
+        return cls.from_bytes(generic_chunk.datas)
 
     @classmethod
     def from_file(cls, file_handle: BinaryIO, offset: int) -> 'InstrumentChunk':
@@ -224,10 +246,8 @@ class InstrumentChunk(Chunk):
             )
         )
 
-    @word_align
     def to_bytes(self) -> bytes:
-        format = pack(
-            "<4sIBBBBBBB",
+        format = self.STRUCT_CHUNK.pack(
             self.HEADER_FORMAT,
             7,  # length
             self.unshifted_note,
@@ -242,30 +262,77 @@ class InstrumentChunk(Chunk):
 
 
 class RiffChunkEditor:
-    riff_chunk: RiffChunk
     acid_chunk: Optional[tuple[AcidChunk, bool]]
     inst_chunk: Optional[tuple[InstrumentChunk, bool]]
+    chunk_index: dict[bytes, tuple[int, int]]
 
-    def __init__(self, filename: str):
+    def __init__(self, filename: str, target_filename: Optional[str] = None):
+        """
+        :param target_filename: if given, the edited file is written there and `filename` is left untouched
+        """
         self.filename = filename
+        self.target_filename = target_filename
         self.acid_chunk = None
         self.inst_chunk = None
+        self.mm: Optional[mmap.mmap] = None
+        self._riff_chunk: Optional[RiffChunk] = None
 
     def __enter__(self):
-        self.fd = open(self.filename, "r+b")
-        # noinspection PyTypeChecker
-        self.riff_chunk = RiffChunk.from_file(self.fd)
+        self.fd = open(self.filename, "rb" if self.target_filename else "r+b")
+        try:
+            if os.fstat(self.fd.fileno()).st_size < RiffChunk.OFFSET_CHUNKS_START:
+                raise InvalidHeaderException("Not a RIFF file")
+            self.mm = mmap.mmap(self.fd.fileno(), 0, access=mmap.ACCESS_READ)
+            self.chunk_index = self._index_chunks(self.mm)
+        except BaseException:
+            self.close()
+            raise
         return self
 
+    @staticmethod
+    def _index_chunks(buffer: mmap.mmap) -> dict[bytes, tuple[int, int]]:
+        """
+        Scans all chunk headers in a single pass, without reading the chunks themselves.
+        :return: {chunk ID: (offset of the chunk, length of its content)}, for the first chunk of each ID
+        """
+        (header_str, length, riff_form) = unpack_from(RiffChunk.STRUCT_RIFF_HEADER, buffer, 0)
+        if not header_str == RiffChunk.HEADER_RIFF or not riff_form == RiffChunk.HEADER_WAVE:
+            raise InvalidHeaderException("Not a RIFF WAVE file")
+
+        index = {}
+        offset = RiffChunk.OFFSET_CHUNKS_START
+        end = min(len(buffer), RiffChunk.OFFSET_SUB_TYPE + length)
+        while offset + Chunk.OFFSET_CHUNK_CONTENT <= end:
+            (chunk_id, chunk_length) = unpack_from(Chunk.STRUCT_HEADER, buffer, offset)
+            index.setdefault(chunk_id, (offset, chunk_length))
+            offset += Chunk.OFFSET_CHUNK_CONTENT + chunk_length + chunk_length % 2
+        return index
+
+    def _get_content_offset(self, chunk_id: bytes) -> Optional[int]:
+        if chunk_id not in self.chunk_index:
+            return None
+        offset, _ = self.chunk_index[chunk_id]
+        return offset + Chunk.OFFSET_CHUNK_CONTENT
+
+    @property
+    def riff_chunk(self) -> RiffChunk:
+        """
+        The fully parsed file, only read when needed.
+        """
+        if self._riff_chunk is None:
+            # noinspection PyTypeChecker
+            self._riff_chunk = RiffChunk.from_file(self.fd)
+        return self._riff_chunk
+
     def get_acid_chunk(self) -> tuple[AcidChunk, bool]:
         """
         :return: (AcidChunk, True if it was already present in the file)
         """
         if not self.acid_chunk:
-            chunk = self.riff_chunk.get_chunk("acid")
+            content_offset = self._get_content_offset(AcidChunk.HEADER_FORMAT)
             acid_chunk: AcidChunk
-            if chunk:
-                acid_chunk = AcidChunk.from_generic_chunk(chunk)
+            if content_offset is not None:
+                acid_chunk = AcidChunk.from_bytes(self.mm, content_offset)
             else:
                 acid_chunk = AcidChunk(
                     file_type=0x01,
@@ -273,7 +340,7 @@ class RiffChunkEditor:
                     n_beats=0,
                     tempo=0,
                 )
-            self.acid_chunk = (acid_chunk, bool(chunk))
+            self.acid_chunk = (acid_chunk, content_offset is not None)
         return self.acid_chunk
 
     def get_inst_chunk(self) -> tuple[InstrumentChunk, bool]:
@@ -281,46 +348,132 @@ class RiffChunkEditor:
         :return: (InstrumentChunk, True if it was already present in the file)
         """
         if not self.inst_chunk:
-            chunk = self.riff_chunk.get_chunk("inst")
+            content_offset = self._get_content_offset(InstrumentChunk.HEADER_FORMAT)
             inst_chunk: InstrumentChunk
-            if chunk:
-                inst_chunk = InstrumentChunk.from_generic_chunk(chunk)
+            if content_offset is not None:
+                inst_chunk = InstrumentChunk.from_bytes(self.mm, content_offset)
             else:
                 inst_chunk = InstrumentChunk()
-            self.inst_chunk = (inst_chunk, bool(chunk))
+            self.inst_chunk = (inst_chunk, content_offset is not None)
         return self.inst_chunk
 
+    def _fast_header_info(self) -> tuple[int, int, int]:
+        """
+        Reads the audio format straight from the "fmt " and "data" chunk headers, without decoding any samples.
+        :return: (sample rate, block align, size of the audio data in bytes)
+        """
+        if FormatChunk.HEADER_FORMAT not in self.chunk_index or DataChunk.HEADER_DATA not in self.chunk_index:
+            raise InvalidWaveException("Valid wave files must have a format and a data chunk")
+        fmt_offset, _ = self.chunk_index[FormatChunk.HEADER_FORMAT]
+        _, data_length = self.chunk_index[DataChunk.HEADER_DATA]
+        (
+            _,
+            _,
+            sample_rate,
+            _,
+            block_align,
+            _,
+        ) = unpack_from("<HHIIHH", self.mm, fmt_offset + Chunk.OFFSET_CHUNK_CONTENT)
+        return sample_rate, block_align, data_length
+
     def calculate_n_beats(self, bpm):
-        # noinspection PyTypeChecker
-        format_chunk: FormatChunk = self.riff_chunk.get_chunk("fmt ")
-        # noinspection PyTypeChecker
-        data_chunk: DataChunk = self.riff_chunk.get_chunk("data")
+        sample_rate, block_align, data_length = self._fast_header_info()
+        if not block_align or not sample_rate:
+            raise InvalidWaveException("The format chunk must have a non-zero block align and sample rate")
+        n_samples = data_length // block_align
 
-        duration_s = data_chunk.samples.shape[0] / format_chunk.sample_rate
+        duration_s = n_samples / sample_rate
         n_beats = round(bpm / 60.0 * duration_s)
         return n_beats
 
+    def _edited_chunks(self) -> List[Chunk]:
+        return ([self.acid_chunk[0]] if self.acid_chunk else []) \
+            + ([self.inst_chunk[0]] if self.inst_chunk else [])
+
+    def _get_patches(self) -> Optional[List[tuple[int, bytes]]]:
+        """
+        Edited chunks that keep their size are overwritten where they are, new chunks are appended to the end
+        of the file (updating the RIFF size), so the audio data does not need to be rewritten.
+        :return: [(offset, bytes to write there)], or None if the edits cannot be applied this way
+        """
+        (_, riff_length) = unpack_from(Chunk.STRUCT_HEADER, self.mm, 0)
+        end = RiffChunk.OFFSET_SUB_TYPE + riff_length
+        patches = []
+        appended = b""
+        for chunk in self._edited_chunks():
+            # noinspection PyTypeChecker
+            chunk_bytes: bytes = chunk.to_bytes()
+            (_, length) = unpack_from(Chunk.STRUCT_HEADER, chunk_bytes)
+            if chunk.get_name in self.chunk_index:
+                offset, original_length = self.chunk_index[chunk.get_name]
+                if length != original_length:
+                    return None  # would have to move all the following chunks
+                if offset + len(chunk_bytes) > end:
+                    return None  # an unpadded last chunk, the pad byte would land past the end of the RIFF chunk
+                patches.append((offset, chunk_bytes))
+            else:
+                appended += chunk_bytes
+
+        if appended:
+            if end != len(self.mm) or end % 2:
+                return None  # trailing data after the RIFF chunk, or an unpadded last chunk
+            patches.append((end, appended))
+            patches.append((RiffChunk.OFFSET_SUB_TYPE - 4, pack("<I", riff_length + len(appended))))
+        return patches
+
     def __exit__(self, exc_type, exc_value, traceback):
+        patches = self._get_patches()
+        if patches is None:
+            self._rewrite()
+        elif self.target_filename:
+            self.close()
+            copy_file(self.filename, self.target_filename)
+            with open(self.target_filename, "r+b") as target:
+                self._apply_patches(target, patches)
+        else:
+            self.mm.close()  # release the mapping before writing to the file
+            self._apply_patches(self.fd, patches)
+            self.close()
+
+    @staticmethod
+    def _apply_patches(file_handle: BinaryIO, patches: List[tuple[int, bytes]]):
+        for offset, data in patches:
+            file_handle.seek(offset)
+            file_handle.write(data)
+
+    def _rewrite(self):
+        """
+        Re-encodes the whole file with the edited chunks.
+        """
         # noinspection PyTypeChecker
         original_chunks: List[Chunk] = self.riff_chunk.sub_chunks
-        to_replace = ([self.acid_chunk[0]] if self.acid_chunk else []) \
-                     + ([self.inst_chunk[0]] if self.inst_chunk else [])
+        to_replace = {chunk.get_name: chunk for chunk in self._edited_chunks()}
         chunks = []
         for chunk in original_chunks:
-            for candidate in to_replace:
-                if candidate.get_name == chunk.get_name:
-                    to_replace.remove(candidate)
-                    chunks.append(candidate)
-                    break
-            else:
-                chunks.append(chunk)
-        chunks.extend(to_replace)
+            chunks.append(to_replace.pop(chunk.get_name, None) or chunk)
+        chunks.extend(to_replace.values())
 
         new_riff_chunk = RiffChunk(chunks)
         # noinspection PyTypeChecker
         wav_bytes: bytes = new_riff_chunk.to_bytes()
-        self.fd.seek(0)
-        self.fd.write(wav_bytes)
+        self.mm.close()  # release the mapping before rewriting the file
+        if self.target_filename:
+            with open(self.target_filename, "wb") as target:
+                if hasattr(os, "posix_fallocate"):
+                    try:
+                        os.posix_fallocate(target.fileno(), 0, len(wav_bytes))
+                    except OSError:
+                        pass  # not supported by the filesystem
+                target.write(wav_bytes)
+        else:
+            self.fd.seek(0)
+            self.fd.write(wav_bytes)
+            self.fd.truncate()
+        self.close()
+
+    def close(self):
+        if self.mm is not None:
+            self.mm.close()
         self.fd.close()
 
 
@@ -328,53 +481,138 @@ class RiffMetadataTransformer(Transformer):
     """
     Adds Tempo and Key metadata to WAV files to be read by FL Studio.
     """
+    executor_class = ProcessPoolExecutor  # parsing and re-encoding the RIFF structure is CPU-bound
+
+    def __init__(self):
+        # file name without extension -> (BPM, root note)
+        self._metadata: dict[str, tuple[Optional[float], Optional[str]]] = {}
 
     def prepare_transform(self, filenames: List[str]) -> List[str]:
-        return filenames
+        """
+        Parses the metadata of all WAV files up-front.
+        :return: only the WAV files, other files are never transformed
+        """
+        wav_filenames = []
+        basename_roots = []
+        for filename in filenames:
+            basename_root, basename_ext = os.path.splitext(os.path.basename(filename))
+            if basename_ext == ".wav":
+                wav_filenames.append(filename)
+                basename_roots.append(basename_root)
+        self._metadata.update(zip(basename_roots, self._scan_metadata_batch(basename_roots)))
+        return wav_filenames
+
+    def accepts(self, filename: str) -> bool:
+        bpm, root_note = self.get_metadata(filename)
+        return bool(bpm or root_note)
+
+    def transform(self, filename: str, out: TextIO) -> str:
+        bpm, root_note = self.get_metadata(filename)
+        if bpm or root_note:
+            with RiffChunkEditor(filename) as editor:
+                self.tag(editor, bpm, root_note, out)
+        return filename
 
-    def transform(self, filename: str) -> str:
-        basename = os.path.basename(filename)
-        basename_root, basename_ext = os.path.splitext(basename)
-        if basename_ext == ".wav":
-            bpm = self._get_bpm(basename_root)
-            root_note = self._get_root_note(basename_root)
-            if not bpm and not root_note:
-                return filename
+    def get_metadata(self, filename: str) -> tuple[Optional[float], Optional[str]]:
+        """
+        :return: (BPM, root note) parsed from the file name, (None, None) for non-WAV files
+        """
+        basename_root, basename_ext = os.path.splitext(os.path.basename(filename))
+        if basename_ext != ".wav":
+            return None, None
+        if basename_root not in self._metadata:
+            self._metadata[basename_root] = self._scan_metadata(basename_root)
+        return self._metadata[basename_root]
 
-            with RiffChunkEditor(filename) as editor:
-                if bpm:
-                    n_beats = editor.calculate_n_beats(bpm)
-                    acid_chunk, acid_chunk_existed = editor.get_acid_chunk()
+    @staticmethod
+    def tag(editor: RiffChunkEditor, bpm: Optional[float], root_note: Optional[str], out: TextIO):
+        if bpm:
+            n_beats = editor.calculate_n_beats(bpm)
+            acid_chunk, acid_chunk_existed = editor.get_acid_chunk()
 
-                    acid_chunk.file_type = acid_chunk.file_type & ~0x01 | 0x04  # Loop, Stretch On
-                    acid_chunk.n_beats = n_beats
-                    acid_chunk.tempo = bpm
-                    print(f"  {'!' if acid_chunk_existed else '+'} BPM: {bpm} + Tempo-sync")
+            acid_chunk.file_type = acid_chunk.file_type & ~0x01 | 0x04  # Loop, Stretch On
+            acid_chunk.n_beats = n_beats
+            acid_chunk.tempo = bpm
+            print(f"  {'!' if acid_chunk_existed else '+'} BPM: {bpm} + Tempo-sync", file=out)
 
-                if root_note:
-                    inst_chunk, inst_chunk_existed = editor.get_inst_chunk()
-                    inst_chunk.unshifted_note = InstrumentChunk.UNSHIFTED_NOTE_C5 + get_note_offset(root_note)
-                    print(f"  {'!' if inst_chunk_existed else '+'} Root: {root_note}")
+        if root_note:
+            inst_chunk, inst_chunk_existed = editor.get_inst_chunk()
+            inst_chunk.unshifted_note = InstrumentChunk.UNSHIFTED_NOTE_C5 + get_note_offset(root_note)
+            print(f"  {'!' if inst_chunk_existed else '+'} Root: {root_note}", file=out)
 
-        return filename
+    @classmethod
+    def _scan_metadata_batch(cls, basename_roots: List[str]) -> List[tuple[Optional[float], Optional[str]]]:
+        """
+        Same as `_scan_metadata` for each of the names, using the compiled scanner from `_fast.pyx` if it is built.
+        """
+        if scan_metadata_batch is not None:
+            return scan_metadata_batch(basename_roots)
+        return [cls._scan_metadata(basename_root) for basename_root in basename_roots]
 
     @staticmethod
-    def _get_bpm(basename_root):
+    def _scan_metadata(basename_root: str) -> tuple[Optional[float], Optional[str]]:
         """
-        Parses filenames such as "sample - 120 BPM C# Maj.wav"
+        Parses BPM and root note from filenames such as "sample - 120 BPM C# Maj.wav", "sample-110bpm.wav"
+        or "Sample (D#).wav", in a single pass over the name.
+        Both values must start after a whitespace or "-"; the first occurrence wins.
+
+        :return: (BPM, root note), either of them None if not present
         """
-        match = re.search(r"[\s-]((\d+\.)?\d+)\s?bpm", basename_root, re.IGNORECASE)
-        if match:
-            return float(match.group(1))
+        bpm = None
+        root_note = None
+        for i, c in enumerate(basename_root):
+            if not (c == "-" or c.isspace()):
+                continue
+            if bpm is None:
+                bpm = _scan_bpm(basename_root, i + 1)
+            if root_note is None:
+                root_note = _scan_root_note(basename_root, i + 1)
+            if bpm is not None and root_note is not None:
+                break
+        return bpm, root_note
+
+
+def _scan_bpm(s: str, start: int) -> Optional[float]:
+    """
+    Matches "120bpm", "120 BPM" or "97.5 bpm" at `start`.
+    """
+    n = len(s)
+    i = start
+    while i < n and s[i].isdecimal():
+        i += 1
+    if i == start:
         return None
+    if i < n and s[i] == ".":
+        j = i + 1
+        while j < n and s[j].isdecimal():
+            j += 1
+        if j > i + 1 and _is_bpm_suffix(s, j):
+            return float(s[start:j])
+    if _is_bpm_suffix(s, i):
+        return float(s[start:i])
+    return None
 
-    @staticmethod
-    def _get_root_note(basename_root):
-        match = re.search((
-            r"([\s-](?P<key1>[A-G][#b]?)((\s(Maj|Min))|([^A-Za-z0-9#][^#-]*)|$))"  # "sample - 120 BPM C# Maj.wav" or "sample - 120 BPM C#.wav"
-            r"|"
-            r"([\s-]\((?P<key2>[A-G][#b]?)\))"  # "Sample (D#).wav"
-        ), basename_root, re.IGNORECASE)
-        if match:
-            return match.group("key1") or match.group("key2")
+
+def _is_bpm_suffix(s: str, i: int) -> bool:
+    if i < len(s) and s[i].isspace():
+        i += 1
+    return s[i:i + 3].lower() == "bpm"
+
+
+def _scan_root_note(s: str, start: int) -> Optional[str]:
+    """
+    Matches "C#" followed by a non-word character or the end of the name, or "(C#)", at `start`.
+    """
+    n = len(s)
+    if start < n and s[start] == "(":
+        i = start + 1
+        if i < n and s[i] in ROOT_NOTE_LETTERS:
+            end = i + 2 if i + 1 < n and s[i + 1] in ROOT_NOTE_ACCIDENTALS else i + 1
+            if end < n and s[end] == ")":
+                return s[i:end]
         return None
+    if start < n and s[start] in ROOT_NOTE_LETTERS:
+        end = start + 2 if start + 1 < n and s[start + 1] in ROOT_NOTE_ACCIDENTALS else start + 1
+        if end == n or s[end] not in ROOT_NOTE_WORD_CHARS:
+            return s[start:end]
+    return None
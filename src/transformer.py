@@ -1,11 +1,22 @@
 from abc import abstractmethod
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import TextIO
 
 
 class Transformer:
+    # Executor used to run `transform` on files in parallel
+    executor_class: type[Executor] = ThreadPoolExecutor
+
     @abstractmethod
     def prepare_transform(self, filenames: list[str]) -> list[str]:
         raise NotImplementedError()
 
+    def accepts(self, filename: str) -> bool:
+        """
+        Whether `transform` needs to be called for the file at all; other files are passed on unchanged.
+        """
+        return True
+
     @abstractmethod
-    def transform(self, filename: str) -> str:
+    def transform(self, filename: str, out: TextIO) -> str:
         raise NotImplementedError()